@@ -0,0 +1,41 @@
+# Gunicorn config for multi-worker serving: gunicorn -c gunicorn.conf.py main:app
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# bcrypt and JWT work is CPU-bound, so scale with cores rather than I/O
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+# Import the app once in the master and fork workers from it
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """Create MongoDB indexes once, before any worker is forked"""
+    from utils.database import ensure_indexes_sync
+
+    try:
+        ensure_indexes_sync()
+    except Exception as e:
+        # Workers fall back to creating indexes themselves during warmup
+        server.log.warning(f"Index creation in master failed: {e}")
+
+
+def post_fork(server, worker):
+    """Stamp the fork time so /health reports this worker's own cold start"""
+    import time
+
+    # CLOCK_MONOTONIC is system-wide on Linux, so the worker can compare against it
+    os.environ["SOCIALTAB_WORKER_STARTED_AT"] = repr(time.monotonic())
+    server.log.info(f"Worker {worker.pid} forked, warming up")
@@ -1,23 +1,53 @@
 from fastapi import FastAPI, Request, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
+import time
 from dotenv import load_dotenv
 
-from utils.database import connect_to_mongo, close_mongo_connection
+from utils.database import connect_to_mongo, close_mongo_connection, ensure_indexes
+from utils.assets import asset_url, build_assets, prerender_pages, serve_asset, serve_page
+from utils.security import warm_password_hashing
+from utils.reminders import scheduler as reminder_scheduler
+from utils.revocation import denylist
+from utils.admission import AdmissionControlMiddleware, stats as admission_stats
 from routes import auth, debts, users
 
 load_dotenv()
 
+# Taken at import. Under gunicorn --preload that happens once in the master, so
+# workers use the stamp gunicorn.conf.py's post_fork sets in their environment
+IMPORTED_AT = time.monotonic()
+WORKER_STARTED_ENV = "SOCIALTAB_WORKER_STARTED_AT"
+
+def worker_started_at() -> float:
+    """Monotonic time this worker process started (fork time under gunicorn)"""
+    forked_at = os.getenv(WORKER_STARTED_ENV)
+    return float(forked_at) if forked_at else IMPORTED_AT
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: finish all warmup before the worker accepts traffic
+    app.state.ready = False
     await connect_to_mongo()
+    await ensure_indexes()
+    build_assets()
+    prerender_pages(templates)
+    templates.get_template("dashboard.html")
+    warm_password_hashing()
+    await denylist.load()
+    app.state.startup_seconds = round(time.monotonic() - worker_started_at(), 3)
+    app.state.ready = True
+    print(f"🔥 Worker {os.getpid()} warm in {app.state.startup_seconds}s")
+    reminder_scheduler.start()
+    denylist.start()
     yield
     # Shutdown
+    await denylist.stop()
+    await reminder_scheduler.stop()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -27,7 +57,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# CORS middleware
+# Admission control: per-user rate limits and a global in-flight cap
+app.add_middleware(AdmissionControlMiddleware)
+
+# CORS middleware (added last so it also wraps 429/503 responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -41,36 +74,71 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = asset_url
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(debts.router, prefix="/debts", tags=["Debts"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 
+def render_page(request: Request, name: str):
+    """Serve a pre-rendered page, falling back to a live render"""
+    response = serve_page(request, name)
+    if response is None:
+        response = templates.TemplateResponse(
+            name, {"request": request, "logged_in": bool(request.cookies.get("token"))}
+        )
+    return response
+
+@app.get("/assets/{filename}")
+async def fingerprinted_asset(request: Request, filename: str):
+    """Fingerprinted, precompressed static assets"""
+    response = serve_asset(request, filename)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return response
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Landing page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return render_page(request, "index.html")
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Login page"""
-    return templates.TemplateResponse("login.html", {"request": request})
+    return render_page(request, "login.html")
 
 @app.get("/signup", response_class=HTMLResponse)
 async def signup_page(request: Request):
     """Signup page"""
-    return templates.TemplateResponse("signup.html", {"request": request})
+    return render_page(request, "signup.html")
 
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard_page(request: Request):
     """Dashboard page"""
-    return templates.TemplateResponse("dashboard.html", {"request": request})
+    return templates.TemplateResponse(
+        "dashboard.html", {"request": request, "logged_in": bool(request.cookies.get("token"))}
+    )
 
 @app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "SocialTab"}
+async def health_check(request: Request):
+    """Health check endpoint, only healthy once warmup has finished"""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting", "service": "SocialTab"}
+        )
+    return {
+        "status": "healthy",
+        "service": "SocialTab",
+        "worker_pid": os.getpid(),
+        "startup_seconds": request.app.state.startup_seconds
+    }
+
+@app.get("/metrics/admission")
+async def admission_metrics():
+    """Admission control counters for this worker"""
+    return admission_stats.snapshot()
 
 if __name__ == "__main__":
     import uvicorn
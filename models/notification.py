@@ -10,6 +10,7 @@ class NotificationType(str, Enum):
     PAYMENT_REQUEST = "payment_request"
     PAYMENT_CONFIRMED = "payment_confirmed"
     REMINDER = "reminder"
+    DIGEST = "digest"
 
 class NotificationCreate(BaseModel):
     user_username: str
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException, status, Response
+from fastapi import APIRouter, HTTPException, status, Response, Depends
 from datetime import datetime, timedelta
+from typing import Optional
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 from models.user import UserCreate, UserLogin, UserResponse
 from utils.database import get_database
-from utils.security import get_password_hash, verify_password, create_access_token
+from utils.security import (
+    ACCESS_TOKEN_EXPIRE_MINUTES, get_password_hash, verify_password, create_access_token,
+    get_current_user, get_token_payload
+)
+from utils.revocation import denylist
 from utils.helpers import serialize_doc
 
 router = APIRouter()
@@ -41,7 +47,14 @@ async def signup(user: UserCreate):
         "total_owing": 0.0
     }
     
-    result = await db.users.insert_one(user_doc)
+    try:
+        result = await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent signup for the same username or email
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username or email already registered"
+        )
     
     # Create access token
     access_token = create_access_token(
@@ -97,9 +110,18 @@ async def login(user: UserLogin, response: Response):
     }
 
 @router.post("/logout")
-async def logout(response: Response):
-    """Logout user"""
+async def logout(response: Response, payload: Optional[dict] = Depends(get_token_payload)):
+    """Logout user and revoke the presented token"""
+    if payload:
+        await denylist.revoke_token(payload)
     response.delete_cookie(key="token")
     return {"message": "Logged out successfully"}
 
-ACCESS_TOKEN_EXPIRE_MINUTES = 10080  # 7 days
+@router.post("/logout-all")
+async def logout_all(response: Response, current_user: dict = Depends(get_current_user)):
+    """Revoke every token issued to the current user"""
+    # The cutoff must outlive the longest-lived token it revokes
+    await denylist.revoke_all(current_user["username"], timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    response.delete_cookie(key="token")
+    return {"message": "Logged out from all devices"}
+
@@ -1,19 +1,34 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
 from datetime import datetime
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
 
 from models.debt import DebtCreate, DebtResponse, DebtAction, DebtStatus, DebtType
 from models.notification import NotificationCreate, NotificationType
 from utils.database import get_database
 from utils.security import get_current_user
-from utils.helpers import serialize_doc, calculate_group_split
+from utils.helpers import serialize_doc, calculate_group_split, build_debt_search_query
+from utils.idempotency import run_idempotent
+from utils.rollups import record_debt_event
 
 router = APIRouter()
 
 @router.post("/create", response_model=dict)
-async def create_debt(debt: DebtCreate, current_user: dict = Depends(get_current_user)):
-    """Create a new debt"""
+async def create_debt(
+    debt: DebtCreate,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new debt (honours Idempotency-Key for safe retries)"""
+    return await run_idempotent(
+        idempotency_key,
+        current_user["username"],
+        "create_debt",
+        debt.dict(),
+        lambda: _create_debt(debt, current_user)
+    )
+
+async def _create_debt(debt: DebtCreate, current_user: dict) -> dict:
     db = get_database()
     
     # Verify debtor exists
@@ -52,6 +67,7 @@ async def create_debt(debt: DebtCreate, current_user: dict = Depends(get_current
         debt_doc["participants"] = participants
     
     result = await db.debts.insert_one(debt_doc)
+    await record_debt_event(db, debt_doc, "created")
     
     # Create notification for debtor
     notification = {
@@ -113,6 +129,53 @@ async def get_debt_history(current_user: dict = Depends(get_current_user)):
         "history": serialize_doc(history)
     }
 
+@router.get("/search", response_model=dict)
+async def search_debts(
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    counterparty: Optional[str] = None,
+    role: str = Query("any", pattern="^(any|creditor|debtor)$"),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    debt_status: Optional[DebtStatus] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Search and filter debts, newest first, with keyset pagination"""
+    db = get_database()
+    
+    before_id = None
+    if cursor:
+        try:
+            before_id = ObjectId(cursor)
+        except:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    query = build_debt_search_query(
+        current_user["username"],
+        role=role,
+        counterparty=counterparty.lower() if counterparty else None,
+        text=q,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        created_after=created_after,
+        created_before=created_before,
+        status=debt_status,
+        before_id=before_id
+    )
+    
+    # Fetch one extra row to know whether another page exists
+    debts = await db.debts.find(query).sort("_id", -1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(debts) > limit
+    debts = debts[:limit]
+    
+    return {
+        "debts": serialize_doc(debts),
+        "next_cursor": str(debts[-1]["_id"]) if has_more else None
+    }
+
 @router.get("/{debt_id}", response_model=dict)
 async def get_debt_detail(debt_id: str, current_user: dict = Depends(get_current_user)):
     """Get debt details"""
@@ -133,8 +196,22 @@ async def get_debt_detail(debt_id: str, current_user: dict = Depends(get_current
     return serialize_doc(debt)
 
 @router.post("/{debt_id}/action", response_model=dict)
-async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Depends(get_current_user)):
+async def debt_action(
+    debt_id: str,
+    action: DebtAction,
+    current_user: dict = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """Perform action on debt (accept, dispute, mark_paid, confirm_paid)"""
+    return await run_idempotent(
+        idempotency_key,
+        current_user["username"],
+        f"debt_action:{debt_id}",
+        action.dict(),
+        lambda: _debt_action(debt_id, action, current_user)
+    )
+
+async def _debt_action(debt_id: str, action: DebtAction, current_user: dict) -> dict:
     db = get_database()
     
     try:
@@ -147,6 +224,7 @@ async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Dep
     
     update_data = {"updated_at": datetime.utcnow()}
     notification_data = None
+    rollup_event = None
     
     if action.action == "accept":
         # Debtor accepts the debt
@@ -156,6 +234,7 @@ async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Dep
             raise HTTPException(status_code=400, detail="Debt is not pending")
         
         update_data["status"] = DebtStatus.ACTIVE
+        rollup_event = "accepted"
         notification_data = {
             "user_username": debt["creditor_username"],
             "notification_type": NotificationType.DEBT_ACCEPTED,
@@ -183,6 +262,8 @@ async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Dep
         
         update_data["status"] = DebtStatus.DISPUTED
         update_data["dispute_reason"] = action.reason
+        if debt["status"] in (DebtStatus.ACTIVE, DebtStatus.PAID):
+            rollup_event = "disputed"
         notification_data = {
             "user_username": debt["creditor_username"],
             "notification_type": NotificationType.DEBT_DISPUTED,
@@ -202,6 +283,7 @@ async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Dep
         
         update_data["status"] = DebtStatus.PAID
         update_data["paid_at"] = datetime.utcnow()
+        rollup_event = "paid"
         notification_data = {
             "user_username": debt["creditor_username"],
             "notification_type": NotificationType.PAYMENT_CONFIRMED,
@@ -225,6 +307,10 @@ async def debt_action(debt_id: str, action: DebtAction, current_user: dict = Dep
     # Update debt
     await db.debts.update_one({"_id": ObjectId(debt_id)}, {"$set": update_data})
     
+    # Keep the dashboard analytics rollups in step
+    if rollup_event:
+        await record_debt_event(db, {**debt, **update_data}, rollup_event)
+    
     # Create notification
     if notification_data:
         await db.notifications.insert_one(notification_data)
@@ -251,5 +337,6 @@ async def delete_debt(debt_id: str, current_user: dict = Depends(get_current_use
         raise HTTPException(status_code=400, detail="Can only delete pending debts")
     
     await db.debts.delete_one({"_id": ObjectId(debt_id)})
+    await record_debt_event(db, debt, "deleted")
     
     return {"message": "Debt deleted successfully"}
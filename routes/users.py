@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from datetime import datetime
+from typing import List, Optional
 
 from models.user import UserResponse, UserUpdate
 from models.notification import NotificationResponse
 from utils.database import get_database
 from utils.security import get_current_user
 from utils.helpers import serialize_doc
+from utils.rollups import month_key, summarize_rollups
 
 router = APIRouter()
 
@@ -63,7 +65,7 @@ async def mark_notification_read(notification_id: str, current_user: dict = Depe
     try:
         result = await db.notifications.update_one(
             {"_id": ObjectId(notification_id), "user_username": current_user["username"]},
-            {"$set": {"read": True}}
+            {"$set": {"read": True, "read_at": datetime.utcnow()}}
         )
     except:
         raise HTTPException(status_code=400, detail="Invalid notification ID")
@@ -110,3 +112,28 @@ async def get_user_stats(current_user: dict = Depends(get_current_user)):
         "total_i_owe": user.get("total_owing", 0.0),
         "net_balance": user.get("total_owed", 0.0) - user.get("total_owing", 0.0)
     }
+
+@router.get("/analytics", response_model=dict)
+async def get_user_analytics(
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Monthly lent/borrowed totals per counterparty for a month range (YYYY-MM)"""
+    db = get_database()
+    
+    now = datetime.utcnow()
+    end = end or month_key(now)
+    if not start:
+        # Default to the last 12 months including the current one
+        months_back = now.year * 12 + now.month - 1 - 11
+        start = f"{months_back // 12}-{months_back % 12 + 1:02d}"
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    rows = await db.debt_rollups.find(
+        {"username": current_user["username"], "month": {"$gte": start, "$lte": end}},
+        {"_id": 0}
+    ).to_list(None)
+    
+    return {"start": start, "end": end, **summarize_rollups(rows)}
@@ -0,0 +1,98 @@
+"""One-time backfill of the debt_rollups collection behind /users/analytics.
+
+Splits the debts collection into _id ranges and folds each range into rollup
+rows concurrently. New debt events are recorded incrementally by the routes,
+so run this once (with --reset) in a quiet window after deploying them:
+
+    python -m scripts.backfill_debt_rollups --reset --chunks 8
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from models.debt import DebtStatus
+from utils.database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+from utils.rollups import rollup_increments, rollup_updates
+
+# Statuses of debts that count as accepted. Disputing an accepted debt reverses
+# its lent/borrowed in the live rollups, so DISPUTED is deliberately left out
+ACCEPTED_STATUSES = {DebtStatus.ACTIVE, DebtStatus.PAID, DebtStatus.ARCHIVED}
+
+PROJECTION = {"creditor_username": 1, "debtor_username": 1, "amount": 1, "status": 1, "created_at": 1, "paid_at": 1}
+
+def debt_events(debt: dict):
+    yield "created"
+    if debt["status"] in ACCEPTED_STATUSES:
+        yield "accepted"
+    if debt.get("paid_at"):
+        yield "paid"
+
+async def backfill_chunk(db, id_range: dict, batch_size: int) -> int:
+    """Fold one _id range of debts into debt_rollups, flushing every batch_size debts"""
+    processed = 0
+    rows = []
+    async for debt in db.debts.find({"_id": id_range}, PROJECTION):
+        for event in debt_events(debt):
+            rows.extend(rollup_increments(debt, event))
+        processed += 1
+        if processed % batch_size == 0:
+            await db.debt_rollups.bulk_write(rollup_updates(rows), ordered=False)
+            rows = []
+    if rows:
+        await db.debt_rollups.bulk_write(rollup_updates(rows), ordered=False)
+    return processed
+
+async def chunk_ranges(db, chunks: int):
+    """Split [first _id, last _id] into contiguous ranges of equal time span"""
+    first = await db.debts.find_one({}, {"_id": 1}, sort=[("_id", 1)])
+    last = await db.debts.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if not first:
+        return []
+
+    start = first["_id"].generation_time.timestamp()
+    span = last["_id"].generation_time.timestamp() + 1 - start
+    bounds = [
+        ObjectId.from_datetime(datetime.fromtimestamp(start + span * i / chunks, timezone.utc))
+        for i in range(chunks)
+    ]
+
+    # Snapshot the upper bound so debts created mid-run are left to the routes
+    ranges = [{"$gte": low, "$lt": high} for low, high in zip(bounds, bounds[1:])]
+    ranges.append({"$gte": bounds[-1], "$lte": last["_id"]})
+    return ranges
+
+async def main(args):
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if args.reset:
+            await db.debt_rollups.drop()
+            print("🧹 Dropped existing debt_rollups")
+        await ensure_indexes()
+
+        ranges = await chunk_ranges(db, args.chunks)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def run(id_range):
+            async with semaphore:
+                return await backfill_chunk(db, id_range, args.batch_size)
+
+        started = time.perf_counter()
+        counts = await asyncio.gather(*(run(id_range) for id_range in ranges))
+        elapsed = time.perf_counter() - started
+        rollups = await db.debt_rollups.estimated_document_count()
+        print(f"📈 Backfilled {sum(counts)} debts into {rollups} rollup rows "
+              f"across {len(ranges)} chunks in {elapsed:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill debt_rollups from the debts collection")
+    parser.add_argument("--reset", action="store_true", help="drop existing rollups first (avoids double counting)")
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
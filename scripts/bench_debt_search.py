@@ -0,0 +1,187 @@
+"""Benchmark /debts/search query shapes on a seeded debts collection.
+
+Seeds a separate database (default: socialtab_bench) with N synthetic debts,
+creates the production indexes, then runs each search shape through explain()
+and checks that it is answered from the search indexes: no COLLSCAN, no
+blocking SORT, and no documents fetched only to be filtered out. The text
+shape is reported for comparison: $text always goes through the text index
+and sorts its matches in memory.
+
+    python -m scripts.bench_debt_search --debts 1000000 --output bench_debt_search.md
+
+--output also writes the results as a Markdown report, with each shape's
+winning plan, ready to paste into a PR or DOCUMENTATION.md.
+"""
+import argparse
+import os
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from pymongo.server_api import ServerApi
+
+from utils.database import INDEXES
+from utils.helpers import build_debt_search_query
+
+load_dotenv()
+
+WORDS = [
+    "lunch", "dinner", "coffee", "pizza", "rent", "uber", "movie", "tickets",
+    "groceries", "concert", "drinks", "gas", "hotel", "flight", "gift", "books",
+]
+STATUSES = ["pending", "active", "disputed", "paid", "archived"]
+PAGE_SIZE = 20
+
+def object_id_at(moment: datetime) -> ObjectId:
+    """Unique ObjectId whose embedded timestamp is `moment`"""
+    return ObjectId(struct.pack(">I", int(moment.timestamp())) + os.urandom(8))
+
+def seed(collection, total: int, users: int, batch_size: int = 10000):
+    start = datetime.utcnow() - timedelta(days=730)
+    inserted = 0
+    while inserted < total:
+        batch = []
+        for _ in range(min(batch_size, total - inserted)):
+            creditor, debtor = random.sample(range(users), 2)
+            created_at = start + timedelta(seconds=random.randint(0, 730 * 86400))
+            batch.append({
+                "_id": object_id_at(created_at),
+                "creditor_username": f"user{creditor}",
+                "debtor_username": f"user{debtor}",
+                "amount": round(random.uniform(1, 500), 2),
+                "description": " ".join(random.sample(WORDS, 2)),
+                "status": random.choice(STATUSES),
+                "debt_type": "single",
+                "created_at": created_at,
+                "updated_at": created_at,
+                "paid_at": None,
+            })
+        collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+        print(f"  seeded {inserted}/{total}", end="\r")
+    print()
+
+def stage_names(plan: dict) -> set:
+    names = {plan.get("stage")}
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            names |= stage_names(plan[key])
+    for child in plan.get("inputStages", []):
+        names |= stage_names(child)
+    return names
+
+def plan_summary(plan: dict) -> str:
+    """Winning plan as a stage chain, e.g. LIMIT > FETCH > IXSCAN(index_name)"""
+    stage = plan.get("stage", "?")
+    if plan.get("indexName"):
+        stage = f"{stage}({plan['indexName']})"
+    children = [plan[key] for key in ("inputStage", "outerStage", "innerStage") if key in plan]
+    children += plan.get("inputStages", [])
+    if not children:
+        return stage
+    if len(children) == 1:
+        return f"{stage} > {plan_summary(children[0])}"
+    return f"{stage} > [" + ", ".join(plan_summary(child) for child in children) + "]"
+
+def search_shapes(users: int):
+    user = f"user{random.randrange(users)}"
+    other = f"user{random.randrange(users)}"
+    now = datetime.utcnow()
+    return [
+        ("recent page", dict(username=user)),
+        ("as creditor", dict(username=user, role="creditor")),
+        ("counterparty", dict(username=user, counterparty=other)),
+        ("amount range", dict(username=user, min_amount=50, max_amount=150)),
+        ("last 90 days", dict(username=user, created_after=now - timedelta(days=90))),
+        ("status", dict(username=user, status="active")),
+        ("combined", dict(username=user, counterparty=other, min_amount=10,
+                          created_after=now - timedelta(days=365), status="paid")),
+        ("text", dict(username=user, text="pizza")),
+    ]
+
+def run(collection, users: int, rounds: int) -> list:
+    print(f"{'shape':<14} {'p50 ms':>8} {'returned':>9} {'keys':>7} {'docs':>7}  plan")
+    results = []
+    for name, params in search_shapes(users):
+        query = build_debt_search_query(**params)
+        timings = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            list(collection.find(query).sort("_id", -1).limit(PAGE_SIZE + 1))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        explain = collection.find(query).sort("_id", -1).limit(PAGE_SIZE + 1).explain()
+        stats = explain["executionStats"]
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        stages = stage_names(winning_plan)
+        indexed = "COLLSCAN" not in stages and "SORT" not in stages \
+            and stats["totalDocsExamined"] <= stats["nReturned"]
+        verdict = "index-only" if indexed else "NOT index-only (" + ",".join(sorted(s for s in stages if s)) + ")"
+
+        timings.sort()
+        result = {
+            "shape": name,
+            "p50_ms": timings[len(timings) // 2],
+            "returned": stats["nReturned"],
+            "keys": stats["totalKeysExamined"],
+            "docs": stats["totalDocsExamined"],
+            "verdict": verdict,
+            "plan": plan_summary(winning_plan),
+        }
+        results.append(result)
+        print(
+            f"{name:<14} {result['p50_ms']:>8.2f} {result['returned']:>9} "
+            f"{result['keys']:>7} {result['docs']:>7}  {verdict}"
+        )
+    return results
+
+def write_report(path: str, results: list, server_version: str, total: int, rounds: int):
+    lines = [
+        "# /debts/search benchmark",
+        "",
+        f"MongoDB {server_version}, {total} debts, {rounds} rounds per shape, page size {PAGE_SIZE}.",
+        "",
+        "| shape | p50 ms | returned | keys examined | docs examined | verdict |",
+        "|---|---:|---:|---:|---:|---|",
+    ]
+    lines += [
+        f"| {r['shape']} | {r['p50_ms']:.2f} | {r['returned']} | {r['keys']} | {r['docs']} | {r['verdict']} |"
+        for r in results
+    ]
+    lines += ["", "Winning plans:", ""]
+    lines += [f"- {r['shape']}: `{r['plan']}`" for r in results]
+    with open(path, "w") as report:
+        report.write("\n".join(lines) + "\n")
+    print(f"📝 Report written to {path}")
+
+def main(args):
+    client = MongoClient(os.getenv("MONGODB_URL"), server_api=ServerApi('1'))
+    collection = client[args.database].debts
+    try:
+        existing = collection.estimated_document_count()
+        if args.reseed or existing < args.debts:
+            collection.drop()
+            print(f"🌱 Seeding {args.debts} debts across {args.users} users...")
+            seed(collection, args.debts, args.users)
+        collection.create_indexes(INDEXES["debts"])
+        total = collection.estimated_document_count()
+        print(f"📐 {total} debts, running {args.rounds} rounds per shape")
+        results = run(collection, args.users, args.rounds)
+        if args.output:
+            write_report(args.output, results, client.server_info()["version"], total, args.rounds)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark debt search queries")
+    parser.add_argument("--database", default="socialtab_bench")
+    parser.add_argument("--debts", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--reseed", action="store_true")
+    parser.add_argument("--output", help="also write a Markdown report to this path")
+    main(parser.parse_args())
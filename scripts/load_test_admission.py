@@ -0,0 +1,126 @@
+"""Load test for admission control: ramps concurrency past saturation.
+
+For each concurrency level, keeps that many requests in flight for a fixed
+duration and reports throughput, shed responses (429/503) and latency
+percentiles. With admission control the p99 of admitted requests should stay
+flat once the server saturates; the excess shows up as fast 503s instead.
+
+    python -m scripts.load_test_admission --url http://localhost:8000 \\
+        --token <jwt> --levels 10,50,100,200,400
+
+--output also writes the ramp and the /metrics/admission counters of every
+worker that answered as a Markdown report.
+
+Per-user rate limits apply, so pass several --token values or raise
+RATE_LIMIT_READS_PER_MINUTE on the server under test to exercise the
+in-flight cap rather than the token buckets.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+
+import httpx
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run_level(client, path: str, tokens, concurrency: int, duration: float):
+    statuses = Counter()
+    admitted_latencies = []
+    all_latencies = []
+    token_cycle = itertools.cycle(tokens)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            headers = {"Authorization": f"Bearer {next(token_cycle)}"}
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            elapsed = (time.perf_counter() - started) * 1000
+            statuses[status] += 1
+            all_latencies.append(elapsed)
+            if status == 200:
+                admitted_latencies.append(elapsed)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return statuses, admitted_latencies, all_latencies
+
+async def worker_counters(client, samples: int) -> dict:
+    """/metrics/admission is per worker, so sample it repeatedly and keep one snapshot per pid"""
+    counters = {}
+    for _ in range(samples):
+        try:
+            response = await client.get("/metrics/admission")
+            snapshot = response.json()
+            counters[snapshot["pid"]] = snapshot
+        except (httpx.HTTPError, ValueError, KeyError):
+            continue
+    return counters
+
+def write_report(path: str, args, rows: list, counters: dict):
+    lines = [
+        "# Admission control load test",
+        "",
+        f"`{args.path}` on {args.url}, {args.duration:g}s per level, {len(args.token)} token(s).",
+        "",
+        "| concurrency | rps | 200 | 429 | 503 | other | p50 ok ms | p99 ok ms | p99 all ms |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    lines += ["", f"/metrics/admission from {len(counters)} worker(s):", "", "```json"]
+    lines += [json.dumps(snapshot, sort_keys=True) for snapshot in counters.values()]
+    lines += ["```"]
+    with open(path, "w") as report:
+        report.write("\n".join(lines) + "\n")
+    print(f"📝 Report written to {path}")
+
+async def main(args):
+    levels = [int(level) for level in args.levels.split(",")]
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    rows = []
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        print(f"{'conc':>5} {'rps':>8} {'200':>7} {'429':>6} {'503':>6} {'other':>6} "
+              f"{'p50 ok':>8} {'p99 ok':>8} {'p99 all':>8}")
+        for concurrency in levels:
+            statuses, admitted, everything = await run_level(
+                client, args.path, args.token, concurrency, args.duration
+            )
+            total = sum(statuses.values())
+            other = total - statuses[200] - statuses[429] - statuses[503]
+            row = [
+                str(concurrency), f"{total / args.duration:.1f}", str(statuses[200]),
+                str(statuses[429]), str(statuses[503]), str(other),
+                f"{percentile(admitted, 0.50):.1f}", f"{percentile(admitted, 0.99):.1f}",
+                f"{percentile(everything, 0.99):.1f}",
+            ]
+            rows.append(row)
+            print(" ".join(value.rjust(width) for value, width in zip(row, (5, 8, 7, 6, 6, 6, 8, 8, 8))))
+
+        counters = await worker_counters(client, args.metrics_samples)
+        for pid, snapshot in counters.items():
+            print(f"📊 Worker {pid} counters: {snapshot}")
+
+    if args.output:
+        write_report(args.output, args, rows, counters)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp load past saturation and report p99 latency")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/debts/my-debts")
+    parser.add_argument("--token", action="append", required=True, help="JWT to send; repeat for several users")
+    parser.add_argument("--levels", default="10,25,50,100,200,400")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--metrics-samples", type=int, default=20,
+                        help="/metrics/admission requests used to reach every worker")
+    parser.add_argument("--output", help="also write a Markdown report to this path")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,164 @@
+"""Notification retention job.
+
+Collapses old REMINDER / DEBT_ACCEPTED notifications into one digest document
+per user per month, backfills read_at on legacy read notifications so the TTL
+index can expire them, and prints the collection size before and after.
+
+Run daily, e.g. from a cron job:
+
+    python -m scripts.notification_retention --rollup-after-days 30
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from models.notification import NotificationType
+from utils.database import connect_to_mongo, close_mongo_connection, ensure_indexes, get_database
+
+ROLLUP_TYPES = [NotificationType.REMINDER, NotificationType.DEBT_ACCEPTED]
+
+async def storage_report(db) -> dict:
+    """Size of the notifications collection and its indexes"""
+    stats = await db.command("collStats", "notifications")
+    return {
+        "count": stats.get("count", 0),
+        "size_bytes": stats.get("size", 0),
+        "storage_bytes": stats.get("storageSize", 0),
+        "index_bytes": stats.get("totalIndexSize", 0),
+    }
+
+def print_report(label: str, report: dict):
+    print(
+        f"📊 {label}: {report['count']} notifications, "
+        f"{report['size_bytes'] / 1024:.1f} KiB data, "
+        f"{report['storage_bytes'] / 1024:.1f} KiB on disk, "
+        f"{report['index_bytes'] / 1024:.1f} KiB indexes"
+    )
+
+async def backfill_read_at(db) -> int:
+    """Give legacy read notifications a read_at so the TTL index applies to them"""
+    result = await db.notifications.update_many(
+        {"read": True, "read_at": {"$exists": False}},
+        [{"$set": {"read_at": "$created_at"}}]
+    )
+    return result.modified_count
+
+DIGEST_LABELS = {
+    NotificationType.REMINDER: ("reminder", "reminders"),
+    NotificationType.DEBT_ACCEPTED: ("accepted debt", "accepted debts"),
+}
+
+def digest_message(month: str, counts: dict) -> str:
+    """e.g. "3 reminders and 1 accepted debt in October 2026" """
+    parts = []
+    for kind, (singular, plural) in DIGEST_LABELS.items():
+        n = counts.get(kind.value, 0)
+        if n:
+            parts.append(f"{n} {singular if n == 1 else plural}")
+    label = datetime.strptime(month, "%Y-%m").strftime("%B %Y")
+    return f"{' and '.join(parts) or 'No activity'} in {label}"
+
+def _digest_update(user_username: str, month: str, counts: dict, any_unread: bool, latest: datetime) -> UpdateOne:
+    update = {
+        "$inc": {f"counts.{kind}": n for kind, n in counts.items()},
+        "$setOnInsert": {
+            "notification_type": NotificationType.DIGEST,
+            "title": f"Activity digest for {month}",
+        },
+    }
+    # Sort the digest where its newest rolled-up item was, not at the top of the
+    # feed. Items are rolled oldest first, so this only moves forward.
+    update["$set"] = {"created_at": latest}
+    if any_unread:
+        # Unread items keep the digest unread and out of the TTL index
+        update["$set"]["read"] = False
+        update["$unset"] = {"read_at": ""}
+    else:
+        update["$setOnInsert"]["read"] = True
+        update["$setOnInsert"]["read_at"] = datetime.utcnow()
+
+    return UpdateOne(
+        {"user_username": user_username, "notification_type": NotificationType.DIGEST, "digest_month": month},
+        update,
+        upsert=True
+    )
+
+async def refresh_digest_messages(db, keys) -> None:
+    """Rewrite the message of the given (user, month) digests from their running counts"""
+    digests = await db.notifications.find(
+        {
+            "notification_type": NotificationType.DIGEST,
+            "$or": [{"user_username": user_username, "digest_month": month} for user_username, month in keys],
+        },
+        {"digest_month": 1, "counts": 1}
+    ).to_list(None)
+    await db.notifications.bulk_write([
+        UpdateOne({"_id": digest["_id"]}, {"$set": {"message": digest_message(digest["digest_month"], digest.get("counts", {}))}})
+        for digest in digests
+    ], ordered=False)
+
+async def rollup(db, older_than: datetime, batch_size: int, dry_run: bool = False) -> int:
+    """Fold old noise notifications into per-user monthly digests, batch by batch"""
+    query = {
+        "notification_type": {"$in": ROLLUP_TYPES},
+        "created_at": {"$lt": older_than},
+    }
+    if dry_run:
+        return await db.notifications.count_documents(query)
+
+    projection = {"user_username": 1, "notification_type": 1, "created_at": 1, "read": 1}
+    rolled = 0
+
+    while True:
+        batch = await db.notifications.find(query, projection).sort("created_at", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        groups = defaultdict(lambda: {"counts": defaultdict(int), "any_unread": False, "latest": datetime.min})
+        for doc in batch:
+            group = groups[(doc["user_username"], doc["created_at"].strftime("%Y-%m"))]
+            group["counts"][doc["notification_type"]] += 1
+            group["any_unread"] = group["any_unread"] or not doc.get("read", False)
+            group["latest"] = max(group["latest"], doc["created_at"])
+
+        await db.notifications.bulk_write([
+            _digest_update(user_username, month, group["counts"], group["any_unread"], group["latest"])
+            for (user_username, month), group in groups.items()
+        ], ordered=False)
+        await refresh_digest_messages(db, groups.keys())
+        await db.notifications.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        rolled += len(batch)
+
+    return rolled
+
+async def main(args):
+    await connect_to_mongo()
+    try:
+        await ensure_indexes()
+        db = get_database()
+
+        print_report("Before", await storage_report(db))
+
+        older_than = datetime.utcnow() - timedelta(days=args.rollup_after_days)
+        if not args.dry_run:
+            backfilled = await backfill_read_at(db)
+            print(f"🕒 Backfilled read_at on {backfilled} read notifications")
+
+        rolled = await rollup(db, older_than, args.batch_size, dry_run=args.dry_run)
+        verb = "Would roll up" if args.dry_run else "Rolled up"
+        print(f"🗜️  {verb} {rolled} notifications older than {args.rollup_after_days} days")
+
+        # TTL deletions run in the background on the server, so they may lag this report
+        print_report("After", await storage_report(db))
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up and expire old notifications")
+    parser.add_argument("--rollup-after-days", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(main(parser.parse_args()))
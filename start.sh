@@ -4,9 +4,16 @@
 echo "🚀 Starting SocialTab..."
 
 # Get port from environment or default to 8000
-PORT=${PORT:-8000}
+export PORT=${PORT:-8000}
 
-echo "📡 Starting server on port $PORT..."
+# Single process with WEB_CONCURRENCY=1, otherwise preloaded gunicorn workers
+WEB_CONCURRENCY=${WEB_CONCURRENCY:-$(nproc 2>/dev/null || echo 1)}
+export WEB_CONCURRENCY
 
-# Start uvicorn
-exec uvicorn main:app --host 0.0.0.0 --port $PORT
+if [ "$WEB_CONCURRENCY" -le 1 ]; then
+    echo "📡 Starting server on port $PORT (single process)..."
+    exec uvicorn main:app --host 0.0.0.0 --port $PORT
+fi
+
+echo "📡 Starting server on port $PORT with $WEB_CONCURRENCY workers..."
+exec gunicorn -c gunicorn.conf.py main:app
@@ -0,0 +1,182 @@
+import asyncio
+import math
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+
+from utils.security import DECODED_TOKEN_STATE, decode_token
+
+# Keep in-flight requests within the Motor pool so handlers never queue inside it
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", os.getenv("MONGODB_MAX_POOL_SIZE", "50")))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+QUEUE_TIMEOUT_SECONDS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000")) / 1000
+
+# Number of reverse proxies in front of the app that append to X-Forwarded-For.
+# The client address is the entry that many hops from the right; everything to
+# its left is client-controlled. 0 ignores the header and uses the socket peer.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+# Requests per minute per user (or client IP for auth); bursts up to a quarter of
+# that. Buckets live in each worker, so the effective limit is this times
+# WEB_CONCURRENCY.
+RATE_LIMITS = {
+    "auth": int(os.getenv("RATE_LIMIT_AUTH_PER_MINUTE", "20")),
+    "writes": int(os.getenv("RATE_LIMIT_WRITES_PER_MINUTE", "60")),
+    "reads": int(os.getenv("RATE_LIMIT_READS_PER_MINUTE", "600")),
+}
+MAX_TRACKED_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "50000"))
+
+API_PREFIXES = ("/debts", "/users")
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """auth, writes or reads for API routes; None for pages, assets and health"""
+    if path.startswith("/auth"):
+        return "auth"
+    if path.startswith(API_PREFIXES):
+        return "reads" if method in ("GET", "HEAD") else "writes"
+    return None
+
+class TokenBucket:
+    """Per-client token buckets for one route class, bounded as an LRU.
+
+    State is per worker process, not shared between gunicorn workers.
+    """
+
+    def __init__(self, per_minute: int, max_clients: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1, per_minute // 4)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+
+        if tokens >= 1:
+            wait = 0.0
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+
+        self._buckets[client] = (tokens, now)
+        self._buckets.move_to_end(client)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+class AdmissionStats:
+    """Per-worker admission counters, served at /metrics/admission"""
+
+    def __init__(self):
+        self.admitted = Counter()
+        self.rate_limited = Counter()
+        self.overloaded = 0
+        self.queue_timeouts = 0
+        self.in_flight = 0
+        self.queued = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": MAX_IN_FLIGHT,
+            "max_queue": MAX_QUEUE,
+            "admitted": dict(self.admitted),
+            "shed": {
+                "rate_limited": dict(self.rate_limited),
+                "overloaded": self.overloaded,
+                "queue_timeout": self.queue_timeouts,
+            },
+        }
+
+stats = AdmissionStats()
+
+def _client_key(scope, headers: dict, kind: str) -> str:
+    """Username from the token for API calls, client IP for auth and anonymous calls"""
+    if kind != "auth":
+        token = None
+        authorization = headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            token = authorization[7:]
+        elif "cookie" in headers:
+            token = cookie_parser(headers["cookie"]).get("token")
+        payload = decode_token(token) if token else None
+        if token:
+            # Handed on to get_token_payload so the JWT is verified once per request
+            scope.setdefault("state", {})[DECODED_TOKEN_STATE] = (token, payload)
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+
+    return f"ip:{client_ip(scope, headers)}"
+
+def client_ip(scope, headers: dict) -> str:
+    """Client address as seen by the nearest trusted proxy, never a spoofable hop"""
+    if TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+class AdmissionControlMiddleware:
+    """Rate limits API calls per client and route class, then caps concurrency.
+
+    Over-limit clients get an immediate 429. Once MAX_IN_FLIGHT requests are
+    running, up to MAX_QUEUE more wait for QUEUE_TIMEOUT_SECONDS; beyond that
+    requests are shed with a 503 instead of piling onto the MongoDB pool.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.buckets = {kind: TokenBucket(limit, MAX_TRACKED_CLIENTS) for kind, limit in RATE_LIMITS.items()}
+        self.slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        kind = route_class(scope["method"], scope["path"])
+        if kind is None:
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        wait = self.buckets[kind].take(_client_key(scope, headers, kind))
+        if wait:
+            stats.rate_limited[kind] += 1
+            return await _reject(429, "Too many requests", wait)(scope, receive, send)
+
+        if self.slots.locked():
+            if stats.queued >= MAX_QUEUE:
+                stats.overloaded += 1
+                return await _reject(503, "Server is busy, please retry", 1)(scope, receive, send)
+            stats.queued += 1
+            try:
+                await asyncio.wait_for(self.slots.acquire(), QUEUE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                stats.queue_timeouts += 1
+                return await _reject(503, "Server is busy, please retry", 1)(scope, receive, send)
+            finally:
+                stats.queued -= 1
+        else:
+            await self.slots.acquire()
+
+        stats.admitted[kind] += 1
+        stats.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stats.in_flight -= 1
+            self.slots.release()
@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+STATIC_DIR = "static"
+ASSET_PREFIX = "/assets"
+
+# Files that go through the fingerprinting pipeline, relative to STATIC_DIR
+PIPELINE_FILES = ["css/style.css", "js/app.js", "js/dashboard.js"]
+
+# Pages whose only dynamic input is whether the visitor has a token cookie
+STATIC_PAGES = ["index.html", "login.html", "signup.html"]
+
+# Starlette appends "; charset=utf-8" to text/* types itself
+MEDIA_TYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript; charset=utf-8",
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass
+class Asset:
+    media_type: str
+    etag: str
+    body: bytes
+    gzip_body: bytes
+    br_body: Optional[bytes] = None
+
+
+@dataclass
+class Page:
+    etag: str
+    body: bytes
+
+
+@dataclass
+class AssetRegistry:
+    # logical path ("css/style.css") -> public URL ("/assets/style.<hash>.css")
+    manifest: Dict[str, str] = field(default_factory=dict)
+    # hashed file name -> precompressed asset
+    assets: Dict[str, Asset] = field(default_factory=dict)
+    # (template name, logged_in) -> pre-rendered page
+    pages: Dict[tuple, Page] = field(default_factory=dict)
+
+
+registry = AssetRegistry()
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build_assets(static_dir: str = STATIC_DIR):
+    """Fingerprint and precompress the pipeline files into the in-memory registry"""
+    manifest = {}
+    assets = {}
+
+    for logical_path in PIPELINE_FILES:
+        with open(os.path.join(static_dir, logical_path), "rb") as f:
+            data = f.read()
+
+        digest = _content_hash(data)
+        stem, ext = os.path.splitext(os.path.basename(logical_path))
+        hashed_name = f"{stem}.{digest}{ext}"
+
+        assets[hashed_name] = Asset(
+            media_type=MEDIA_TYPES.get(ext, "application/octet-stream"),
+            etag=f'"{digest}"',
+            body=data,
+            gzip_body=gzip.compress(data, compresslevel=9, mtime=0),
+            br_body=brotli.compress(data, quality=11) if brotli else None,
+        )
+        manifest[logical_path] = f"{ASSET_PREFIX}/{hashed_name}"
+
+    registry.manifest = manifest
+    registry.assets = assets
+    return manifest
+
+
+def asset_url(logical_path: str) -> str:
+    """Template helper: hashed URL for a pipeline file, plain /static URL otherwise"""
+    return registry.manifest.get(logical_path, f"/static/{logical_path}")
+
+
+def prerender_pages(templates):
+    """Render the static pages once per login state and keep them in memory"""
+    pages = {}
+    for name in STATIC_PAGES:
+        template = templates.get_template(name)
+        for logged_in in (False, True):
+            body = template.render(logged_in=logged_in).encode("utf-8")
+            pages[(name, logged_in)] = Page(etag=f'"{_content_hash(body)}"', body=body)
+
+    registry.pages = pages
+    return pages
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+
+
+def serve_asset(request: Request, hashed_name: str) -> Optional[Response]:
+    """Build the response for a fingerprinted asset, or None if unknown"""
+    asset = registry.assets.get(hashed_name)
+    if asset is None:
+        return None
+
+    headers = {
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "ETag": asset.etag,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if asset.br_body is not None and "br" in accept_encoding:
+        headers["Content-Encoding"] = "br"
+        body = asset.br_body
+    elif "gzip" in accept_encoding:
+        headers["Content-Encoding"] = "gzip"
+        body = asset.gzip_body
+    else:
+        body = asset.body
+
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+def serve_page(request: Request, name: str) -> Optional[Response]:
+    """Build the response for a pre-rendered page, or None if not cached"""
+    logged_in = bool(request.cookies.get("token"))
+    page = registry.pages.get((name, logged_in))
+    if page is None:
+        return None
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "ETag": page.etag,
+        "Vary": "Cookie",
+    }
+    if _etag_matches(request, page.etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=page.body, media_type="text/html", headers=headers)
@@ -1,6 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
 from pymongo.server_api import ServerApi
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,13 +14,75 @@ class Database:
 
 db = Database()
 
-async def connect_to_mongo():
-    """Connect to MongoDB Atlas"""
+# Stored idempotent responses expire after this long
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")) * 3600
+
+# Read notifications are deleted this long after being read
+NOTIFICATION_RETENTION_SECONDS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30")) * 86400
+
+# Indexes backing the queries in routes/, created once per deploy
+INDEXES = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "debts": [
+        IndexModel([("creditor_username", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("debtor_username", ASCENDING), ("status", ASCENDING)]),
+        # Reminder scheduler scans active debts in _id order
+        IndexModel([("status", ASCENDING), ("_id", ASCENDING)]),
+        # /debts/search: equality on the user (and counterparty), sort on _id,
+        # then amount/status so range filters are checked on index keys
+        IndexModel([("creditor_username", ASCENDING), ("_id", DESCENDING), ("amount", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("debtor_username", ASCENDING), ("_id", DESCENDING), ("amount", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("creditor_username", ASCENDING), ("debtor_username", ASCENDING), ("_id", DESCENDING), ("amount", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("debtor_username", ASCENDING), ("creditor_username", ASCENDING), ("_id", DESCENDING), ("amount", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("description", TEXT)]),
+    ],
+    "notifications": [
+        IndexModel([("user_username", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("user_username", ASCENDING), ("read", ASCENDING)]),
+        IndexModel([("read_at", ASCENDING)], expireAfterSeconds=NOTIFICATION_RETENTION_SECONDS),
+        IndexModel([("notification_type", ASCENDING), ("created_at", ASCENDING)]),
+        IndexModel(
+            [("user_username", ASCENDING), ("digest_month", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"notification_type": "digest"}
+        ),
+    ],
+    "debt_rollups": [
+        IndexModel([("username", ASCENDING), ("month", ASCENDING), ("counterparty", ASCENDING)], unique=True),
+    ],
+    "revoked_tokens": [
+        IndexModel([("jti", ASCENDING)], unique=True, partialFilterExpression={"jti": {"$exists": True}}),
+        IndexModel([("revoked_at", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "idempotency_keys": [
+        IndexModel([("username", ASCENDING), ("key", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+    ],
+}
+
+# Set by the gunicorn master once indexes exist so workers skip the round trips
+INDEXES_READY_ENV = "SOCIALTAB_INDEXES_READY"
+
+def _client_options():
+    return {
+        "server_api": ServerApi('1'),
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+    }
+
+def _get_mongodb_url():
     mongodb_url = os.getenv("MONGODB_URL")
     if not mongodb_url:
         raise ValueError("MONGODB_URL not found in environment variables")
-    
-    db.client = AsyncIOMotorClient(mongodb_url, server_api=ServerApi('1'))
+    return mongodb_url
+
+async def connect_to_mongo():
+    """Connect to MongoDB Atlas"""
+    db.client = AsyncIOMotorClient(_get_mongodb_url(), **_client_options())
     db.db = db.client.socialtab
     
     # Test connection
@@ -28,6 +93,79 @@ async def connect_to_mongo():
         print(f"❌ Failed to connect to MongoDB: {e}")
         raise
 
+# IndexOptionsConflict / IndexKeySpecsConflict: same keys, different options
+INDEX_CONFLICT_CODES = {85, 86}
+
+def _ttl_collmod(collection: str, index: IndexModel) -> dict:
+    """collMod command that changes an existing TTL index's expiry in place"""
+    spec = index.document
+    return {
+        "collMod": collection,
+        "index": {"keyPattern": spec["key"], "expireAfterSeconds": spec["expireAfterSeconds"]}
+    }
+
+def _resolve_index_failure(collection: str, index: IndexModel, error: OperationFailure) -> Optional[dict]:
+    """collMod that fixes an index build failure in place, or None after logging it"""
+    # A changed TTL (e.g. NOTIFICATION_RETENTION_DAYS) can be updated in place
+    if error.code in INDEX_CONFLICT_CODES and "expireAfterSeconds" in index.document:
+        print(f"📇 Updating TTL on {collection}.{index.document['name']}")
+        return _ttl_collmod(collection, index)
+    # Anything else (e.g. duplicates blocking a unique index) needs a manual
+    # cleanup; log it rather than keep every worker from booting
+    print(f"⚠️ Could not build index {collection}.{index.document['name']}: {error}")
+    return None
+
+# The async and sync variants below differ only in awaiting; the decisions
+# live in _resolve_index_failure.
+async def _ensure_collection_indexes(database, collection: str, indexes):
+    try:
+        await database[collection].create_indexes(indexes)
+        return
+    except OperationFailure:
+        pass
+    # Create them one by one so a single failure doesn't hold back the rest
+    for index in indexes:
+        try:
+            await database[collection].create_indexes([index])
+        except OperationFailure as e:
+            command = _resolve_index_failure(collection, index, e)
+            if command:
+                await database.command(command)
+
+def _ensure_collection_indexes_sync(database, collection: str, indexes):
+    try:
+        database[collection].create_indexes(indexes)
+        return
+    except OperationFailure:
+        pass
+    for index in indexes:
+        try:
+            database[collection].create_indexes([index])
+        except OperationFailure as e:
+            command = _resolve_index_failure(collection, index, e)
+            if command:
+                database.command(command)
+
+async def ensure_indexes():
+    """Create collection indexes unless a parent process already did"""
+    if os.getenv(INDEXES_READY_ENV):
+        return
+    for collection, indexes in INDEXES.items():
+        await _ensure_collection_indexes(db.db, collection, indexes)
+    print("📇 MongoDB indexes ensured")
+
+def ensure_indexes_sync():
+    """Create collection indexes from a non-async context (gunicorn master)"""
+    client = MongoClient(_get_mongodb_url(), server_api=ServerApi('1'))
+    try:
+        database = client.socialtab
+        for collection, indexes in INDEXES.items():
+            _ensure_collection_indexes_sync(database, collection, indexes)
+    finally:
+        client.close()
+    os.environ[INDEXES_READY_ENV] = "1"
+    print("📇 MongoDB indexes ensured")
+
 async def close_mongo_connection():
     """Close MongoDB connection"""
     if db.client:
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import List, Dict
+from typing import List, Dict, Optional
 from bson import ObjectId
 
 def serialize_doc(doc):
@@ -55,3 +55,59 @@ def format_currency(amount: float) -> str:
 def validate_pin(pin: str) -> bool:
     """Validate PIN format (4-6 digits)"""
     return pin.isdigit() and 4 <= len(pin) <= 6
+
+def build_debt_search_query(
+    username: str,
+    role: str = "any",
+    counterparty: Optional[str] = None,
+    text: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    status: Optional[str] = None,
+    before_id: Optional[ObjectId] = None
+) -> Dict:
+    """Build a debt search filter that the compound search indexes can answer.
+
+    Results are keyset-paginated newest first on _id, so the date range and the
+    cursor both become _id bounds. Each role gets its own $or branch with an
+    equality prefix, which lets every branch walk its own index in _id order.
+    """
+    id_range = {}
+    if created_after:
+        id_range["$gte"] = ObjectId.from_datetime(created_after)
+    if created_before:
+        id_range["$lt"] = ObjectId.from_datetime(created_before)
+    if before_id:
+        id_range["$lt"] = min(before_id, id_range["$lt"]) if "$lt" in id_range else before_id
+
+    common = {}
+    if id_range:
+        common["_id"] = id_range
+    amount_range = {}
+    if min_amount is not None:
+        amount_range["$gte"] = min_amount
+    if max_amount is not None:
+        amount_range["$lte"] = max_amount
+    if amount_range:
+        common["amount"] = amount_range
+    if status:
+        common["status"] = status
+
+    branches = []
+    if role in ("any", "creditor"):
+        branch = {"creditor_username": username, **common}
+        if counterparty:
+            branch["debtor_username"] = counterparty
+        branches.append(branch)
+    if role in ("any", "debtor"):
+        branch = {"debtor_username": username, **common}
+        if counterparty:
+            branch["creditor_username"] = counterparty
+        branches.append(branch)
+
+    query = branches[0] if len(branches) == 1 else {"$or": branches}
+    if text:
+        query = {"$text": {"$search": text}, **query}
+    return query
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from fastapi import HTTPException, status
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_database, IDEMPOTENCY_TTL_SECONDS
+
+FRONT_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+FRONT_CACHE_TTL_SECONDS = min(IDEMPOTENCY_TTL_SECONDS, 600)
+
+# How long a claim blocks retries before another request may take it over;
+# longer than any request can run (gunicorn kills workers after its timeout)
+LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "90"))
+
+MAX_KEY_LENGTH = 255
+
+class ResponseCache:
+    """Small in-process LRU of completed responses, keyed by (username, key)"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+
+    def get(self, cache_key: tuple) -> Optional[dict]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        stored_at, record = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return record
+
+    def set(self, cache_key: tuple, record: dict):
+        self._entries[cache_key] = (time.monotonic(), record)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+front_cache = ResponseCache(FRONT_CACHE_SIZE, FRONT_CACHE_TTL_SECONDS)
+
+def request_hash(payload: dict) -> str:
+    """Stable fingerprint of a request body, to catch keys reused with new data"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _check_same_request(record: dict, endpoint: str, body_hash: str):
+    """Refuse keys reused on a different endpoint or with a different body"""
+    if record["endpoint"] != endpoint or record.get("request_hash", body_hash) != body_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+def _in_progress() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="A request with this Idempotency-Key is still in progress",
+        headers={"Retry-After": "1"}
+    )
+
+async def _claim(db, username: str, key: str, endpoint: str, body_hash: str) -> tuple:
+    """Claim the key for this request.
+
+    Returns (None, claim_id) once claimed, or (record, None) to replay. A claim whose
+    lease has lapsed (its worker was cancelled, killed or lost its connection)
+    is taken over instead of blocking retries until the TTL.
+    """
+    now = datetime.utcnow()
+    claim = {
+        "claim_id": uuid.uuid4().hex,
+        "endpoint": endpoint,
+        "request_hash": body_hash,
+        "locked_until": now + timedelta(seconds=LEASE_SECONDS)
+    }
+    try:
+        await db.idempotency_keys.insert_one({
+            "username": username,
+            "key": key,
+            "completed": False,
+            "created_at": now,
+            **claim
+        })
+        return None, claim["claim_id"]
+    except DuplicateKeyError:
+        pass
+
+    record = await db.idempotency_keys.find_one({"username": username, "key": key})
+    if record is None:
+        # Expired or released between the insert and the read
+        raise _in_progress()
+    _check_same_request(record, endpoint, body_hash)
+    if record.get("completed"):
+        return record, None
+    locked_until = record.get("locked_until") or record["created_at"] + timedelta(seconds=LEASE_SECONDS)
+    if locked_until > now:
+        raise _in_progress()
+
+    taken = await db.idempotency_keys.find_one_and_update(
+        {"username": username, "key": key, "completed": False, "claim_id": record.get("claim_id")},
+        {"$set": claim}
+    )
+    if taken is None:
+        raise _in_progress()
+    return None, claim["claim_id"]
+
+async def run_idempotent(
+    key: Optional[str],
+    username: str,
+    endpoint: str,
+    payload: dict,
+    handler: Callable[[], Awaitable[dict]]
+) -> dict:
+    """Run a write handler at most once per Idempotency-Key.
+
+    Repeats of a completed request get the stored response without touching
+    the write path; a repeat that races an in-flight original gets a 409, and
+    a repeat with a different body gets a 422.
+    """
+    if not key:
+        return await handler()
+
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+    body_hash = request_hash(payload)
+    cache_key = (username, key)
+    cached = front_cache.get(cache_key)
+    if cached is not None:
+        _check_same_request(cached, endpoint, body_hash)
+        return cached["response"]
+
+    db = get_database()
+    record, claim_id = await _claim(db, username, key, endpoint, body_hash)
+    if record is not None:
+        front_cache.set(cache_key, record)
+        return record["response"]
+
+    owned = {"username": username, "key": key, "claim_id": claim_id}
+    try:
+        response = await handler()
+    except BaseException:
+        # Failed or cancelled requests are not stored so the client can retry;
+        # shield the release so a cancellation can't skip it
+        await asyncio.shield(db.idempotency_keys.delete_one(owned))
+        raise
+
+    record = {"endpoint": endpoint, "request_hash": body_hash, "response": response}
+    front_cache.set(cache_key, record)
+    try:
+        await db.idempotency_keys.update_one(owned, {"$set": {"completed": True, "response": response}})
+    except Exception as e:
+        # The write already happened, so still answer; retries on this worker
+        # replay from the front cache
+        print(f"⚠️ Failed to store idempotent response for {username}/{key}: {e}")
+    return response
@@ -0,0 +1,203 @@
+import asyncio
+import heapq
+import math
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from models.debt import DebtStatus
+from models.notification import NotificationType
+from utils.database import get_database
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() == "true"
+TICK_SECONDS = int(os.getenv("REMINDER_TICK_SECONDS", "60"))
+SCAN_CHUNK = int(os.getenv("REMINDER_SCAN_CHUNK", "1000"))
+CHUNKS_PER_TICK = int(os.getenv("REMINDER_CHUNKS_PER_TICK", "20"))
+DAILY_CAP = int(os.getenv("REMINDER_DAILY_CAP", "3"))
+FIRST_REMINDER = timedelta(days=int(os.getenv("REMINDER_FIRST_DAYS", "7")))
+MAX_INTERVAL = timedelta(days=int(os.getenv("REMINDER_MAX_INTERVAL_DAYS", "30")))
+# Debts due before the cursor comes back round are kept in memory. The horizon
+# is sized to one full pass (estimated from the active-debt count when a pass
+# starts), with this as the floor; later debts are picked up on a future pass
+MIN_HORIZON = timedelta(minutes=int(os.getenv("REMINDER_HORIZON_MINUTES", "60")))
+MAX_HEAP_SIZE = int(os.getenv("REMINDER_MAX_HEAP_SIZE", "100000"))
+
+STATE_ID = "reminders"
+LEASE = timedelta(seconds=TICK_SECONDS * 3)
+
+SCAN_PROJECTION = {"updated_at": 1, "reminder_count": 1, "last_reminded_at": 1}
+
+def next_reminder_at(debt: dict) -> datetime:
+    """Exponential backoff: first reminder after FIRST_REMINDER, then doubling up to MAX_INTERVAL"""
+    count = debt.get("reminder_count", 0)
+    if count == 0:
+        return debt["updated_at"] + FIRST_REMINDER
+    return debt["last_reminded_at"] + min(FIRST_REMINDER * (2 ** count), MAX_INTERVAL)
+
+def reminder_notification(debt: dict, now: datetime) -> dict:
+    return {
+        "user_username": debt["debtor_username"],
+        "notification_type": NotificationType.REMINDER,
+        "title": "Friendly Reminder",
+        "message": f"You still owe {debt['creditor_username']} ${debt['amount']:.2f} for {debt['description']}",
+        "debt_id": str(debt["_id"]),
+        "action_url": f"/debts/{debt['_id']}",
+        "read": False,
+        "created_at": now
+    }
+
+class ReminderScheduler:
+    """Emits REMINDER notifications for stale active debts.
+
+    Each tick advances a checkpointed cursor over active debts by up to
+    CHUNKS_PER_TICK chunks in (status, _id) index order, pushes debts due before
+    the cursor's next visit onto a heap, and fires everything due with a single
+    insert_many. Debts held back by the daily cap are re-queued for tomorrow.
+    Only the worker holding the lease in scheduler_state runs ticks, so
+    multi-worker deploys don't double up.
+    """
+
+    def __init__(self):
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.heap: List[tuple] = []
+        self.queued: Dict = {}
+        self.sent_today: Counter = Counter()
+        self.sent_day: Optional[str] = None
+        self.horizon = MIN_HORIZON
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if REMINDERS_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Reminder tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    async def _acquire_lease(self, db, now: datetime) -> Optional[dict]:
+        """Take or renew the scheduler lease; returns the state document if we hold it"""
+        try:
+            return await db.scheduler_state.find_one_and_update(
+                {"_id": STATE_ID, "$or": [{"lease_until": {"$lt": now}}, {"lease_owner": self.owner}]},
+                {"$set": {"lease_owner": self.owner, "lease_until": now + LEASE}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Another worker holds the lease; drop anything we queued as leader
+            self.heap, self.queued = [], {}
+            self.sent_day = None
+            return None
+
+    async def tick(self):
+        db = get_database()
+        now = datetime.utcnow()
+        state = await self._acquire_lease(db, now)
+        if state is None:
+            return
+
+        cursor = state.get("cursor")
+        for _ in range(CHUNKS_PER_TICK):
+            if cursor is None:
+                await self._size_horizon(db)
+            cursor = await self._scan_chunk(db, cursor, now)
+            if cursor is None:
+                break
+        sent = await self._fire_due(db, now)
+        if sent:
+            print(f"🔔 Sent {sent} debt reminders")
+
+    async def _size_horizon(self, db):
+        """At the start of a pass, make the horizon cover the whole pass"""
+        active = await db.debts.count_documents({"status": DebtStatus.ACTIVE})
+        pass_ticks = math.ceil(active / (SCAN_CHUNK * CHUNKS_PER_TICK)) or 1
+        # Headroom for growth during the pass
+        self.horizon = max(MIN_HORIZON, timedelta(seconds=pass_ticks * TICK_SECONDS * 1.5))
+
+    async def _scan_chunk(self, db, cursor, now: datetime):
+        """Queue one chunk of active debts; returns the new cursor (None at the end)"""
+        query = {"status": DebtStatus.ACTIVE}
+        if cursor:
+            query["_id"] = {"$gt": cursor}
+        chunk = await db.debts.find(query, SCAN_PROJECTION).sort("_id", 1).limit(SCAN_CHUNK).to_list(SCAN_CHUNK)
+
+        for debt in chunk:
+            due = next_reminder_at(debt)
+            if due <= now + self.horizon and debt["_id"] not in self.queued and len(self.heap) < MAX_HEAP_SIZE:
+                heapq.heappush(self.heap, (due, debt["_id"]))
+                self.queued[debt["_id"]] = due
+
+        # Checkpoint so a restart or a new leader resumes here; wrap at the end
+        next_cursor = chunk[-1]["_id"] if len(chunk) == SCAN_CHUNK else None
+        await db.scheduler_state.update_one({"_id": STATE_ID}, {"$set": {"cursor": next_cursor}})
+        return next_cursor
+
+    async def _load_sent_today(self, db, now: datetime):
+        day = now.strftime("%Y-%m-%d")
+        if self.sent_day == day:
+            return
+        midnight = datetime(now.year, now.month, now.day)
+        counts = await db.notifications.aggregate([
+            {"$match": {"notification_type": NotificationType.REMINDER, "created_at": {"$gte": midnight}}},
+            {"$group": {"_id": "$user_username", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        self.sent_today = Counter({row["_id"]: row["count"] for row in counts})
+        self.sent_day = day
+
+    async def _fire_due(self, db, now: datetime) -> int:
+        due_ids = []
+        while self.heap and self.heap[0][0] <= now:
+            _, debt_id = heapq.heappop(self.heap)
+            self.queued.pop(debt_id, None)
+            due_ids.append(debt_id)
+        if not due_ids:
+            return 0
+
+        # Re-read: the debt may have been paid or reminded since it was queued
+        debts = await db.debts.find({"_id": {"$in": due_ids}, "status": DebtStatus.ACTIVE}).to_list(None)
+        await self._load_sent_today(db, now)
+
+        tomorrow = datetime(now.year, now.month, now.day) + timedelta(days=1)
+        notifications = []
+        updates = []
+        for debt in debts:
+            if next_reminder_at(debt) > now:
+                continue
+            if self.sent_today[debt["debtor_username"]] >= DAILY_CAP:
+                # Capped for today; keep it queued rather than waiting a full pass
+                heapq.heappush(self.heap, (tomorrow, debt["_id"]))
+                self.queued[debt["_id"]] = tomorrow
+                continue
+            self.sent_today[debt["debtor_username"]] += 1
+            notifications.append(reminder_notification(debt, now))
+            updates.append(UpdateOne(
+                {"_id": debt["_id"]},
+                {"$set": {"last_reminded_at": now}, "$inc": {"reminder_count": 1}}
+            ))
+
+        if notifications:
+            await db.notifications.insert_many(notifications, ordered=False)
+            await db.debts.bulk_write(updates, ordered=False)
+        return len(notifications)
+
+scheduler = ReminderScheduler()
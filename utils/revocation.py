@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import math
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from utils.database import get_database
+
+REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+# Re-read a little history on each refresh so writes from other workers that
+# land slightly out of revoked_at order are not skipped
+REFRESH_OVERLAP = timedelta(seconds=30)
+# Revoked entries expire from Mongo but not from a Bloom filter, so rebuild
+# from scratch now and then to keep the false-positive rate down
+REBUILD_SECONDS = int(os.getenv("REVOCATION_REBUILD_SECONDS", "3600"))
+EXPECTED_REVOCATIONS = int(os.getenv("REVOCATION_EXPECTED_ITEMS", "100000"))
+FALSE_POSITIVE_RATE = float(os.getenv("REVOCATION_FALSE_POSITIVE_RATE", "0.001"))
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over one blake2b digest"""
+
+    def __init__(self, expected_items: int, false_positive_rate: float):
+        self.size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / expected_items * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class TokenDenylist:
+    """Per-worker view of the revoked_tokens collection.
+
+    Single-token revocations go into a Bloom filter; "log out everywhere"
+    cutoffs are few, so they are kept exactly as username -> all_before. Both
+    are refreshed incrementally from revoked_at, so checking a token is an
+    in-memory lookup unless the Bloom filter reports a probable hit, in which
+    case revoked_tokens is queried to rule out a false positive.
+    """
+
+    def __init__(self):
+        self.bloom = BloomFilter(EXPECTED_REVOCATIONS, FALSE_POSITIVE_RATE)
+        self.cutoffs: Dict[str, float] = {}
+        self.last_seen: Optional[datetime] = None
+        self.last_rebuild: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """Rebuild the filter from every unexpired revocation"""
+        bloom = BloomFilter(EXPECTED_REVOCATIONS, FALSE_POSITIVE_RATE)
+        cutoffs = {}
+        last_seen = None
+        async for entry in get_database().revoked_tokens.find({}, {"_id": 0}).sort("revoked_at", 1):
+            self._add_entry(entry, bloom, cutoffs)
+            last_seen = entry["revoked_at"]
+        self.bloom = bloom
+        self.cutoffs = cutoffs
+        self.last_seen = last_seen
+        self.last_rebuild = datetime.utcnow()
+
+    async def refresh(self):
+        """Add revocations recorded since the last refresh (by any worker)"""
+        query = {"revoked_at": {"$gte": self.last_seen - REFRESH_OVERLAP}} if self.last_seen else {}
+        async for entry in get_database().revoked_tokens.find(query, {"_id": 0}).sort("revoked_at", 1):
+            self._add_entry(entry, self.bloom, self.cutoffs)
+            self.last_seen = entry["revoked_at"]
+
+    @staticmethod
+    def _add_entry(entry: dict, bloom: BloomFilter, cutoffs: Dict[str, float]):
+        if entry.get("jti"):
+            bloom.add(f"jti:{entry['jti']}")
+        if entry.get("all_before") is not None:
+            username = entry["username"]
+            cutoffs[username] = max(cutoffs.get(username, 0), entry["all_before"])
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(REFRESH_SECONDS)
+            try:
+                if datetime.utcnow() - self.last_rebuild > timedelta(seconds=REBUILD_SECONDS):
+                    await self.load()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Token denylist refresh failed: {e}")
+
+    async def is_revoked(self, payload: dict) -> bool:
+        """Check a decoded token; only touches Mongo on a probable Bloom hit"""
+        # Tokens issued strictly before the user's cutoff are revoked
+        cutoff = self.cutoffs.get(payload.get("sub"))
+        if cutoff is not None and payload.get("iat", 0) < cutoff:
+            return True
+
+        jti = payload.get("jti")
+        if jti is None or f"jti:{jti}" not in self.bloom:
+            return False
+        return await get_database().revoked_tokens.find_one({"jti": jti}, {"_id": 1}) is not None
+
+    async def revoke_token(self, payload: dict):
+        """Revoke a single token until it would have expired anyway"""
+        if not payload.get("jti"):
+            return
+        entry = {
+            "jti": payload["jti"],
+            "username": payload.get("sub"),
+            "expires_at": datetime.utcfromtimestamp(payload["exp"]),
+            "revoked_at": datetime.utcnow()
+        }
+        await get_database().revoked_tokens.update_one({"jti": entry["jti"]}, {"$setOnInsert": entry}, upsert=True)
+        self.bloom.add(f"jti:{entry['jti']}")
+
+    async def revoke_all(self, username: str, token_lifetime: timedelta):
+        """Revoke every token issued to a user up to now ("log out everywhere")"""
+        now = datetime.utcnow()
+        entry = {
+            "username": username,
+            # Sub-second epoch time, comparable with the float iat in our tokens
+            "all_before": time.time(),
+            "expires_at": now + token_lifetime,
+            "revoked_at": now
+        }
+        await get_database().revoked_tokens.insert_one(entry)
+        self._add_entry(entry, self.bloom, self.cutoffs)
+
+denylist = TokenDenylist()
@@ -0,0 +1,92 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from pymongo import UpdateOne
+
+# Per (username, month, counterparty) counters kept in debt_rollups:
+#   debts       debts created between the two users (any status)
+#   lent        accepted, undisputed debts where the user is the creditor, by creation month
+#   borrowed    accepted, undisputed debts where the user is the debtor, by creation month
+#   repaid_in   payments the user received, by payment month
+#   repaid_out  payments the user made, by payment month
+ROLLUP_FIELDS = ["debts", "lent", "borrowed", "repaid_in", "repaid_out"]
+
+def month_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+def rollup_increments(debt: dict, event: str) -> List[tuple]:
+    """(username, month, counterparty, {field: delta}) rows for one debt event"""
+    creditor = debt["creditor_username"]
+    debtor = debt["debtor_username"]
+    amount = debt["amount"]
+
+    if event in ("created", "deleted"):
+        sign = 1 if event == "created" else -1
+        month = month_key(debt["created_at"])
+        return [
+            (creditor, month, debtor, {"debts": sign}),
+            (debtor, month, creditor, {"debts": sign}),
+        ]
+    if event in ("accepted", "disputed"):
+        # Disputing an already accepted debt takes it back out of lent/borrowed
+        signed = amount if event == "accepted" else -amount
+        month = month_key(debt["created_at"])
+        return [
+            (creditor, month, debtor, {"lent": signed}),
+            (debtor, month, creditor, {"borrowed": signed}),
+        ]
+    if event == "paid":
+        month = month_key(debt["paid_at"])
+        return [
+            (creditor, month, debtor, {"repaid_in": amount}),
+            (debtor, month, creditor, {"repaid_out": amount}),
+        ]
+    raise ValueError(f"Unknown rollup event: {event}")
+
+def rollup_updates(rows: Iterable[tuple]) -> List[UpdateOne]:
+    """Merge increment rows by key into upserting $inc updates"""
+    merged: Dict[tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(int))
+    for username, month, counterparty, deltas in rows:
+        for field, delta in deltas.items():
+            merged[(username, month, counterparty)][field] += delta
+
+    return [
+        UpdateOne(
+            {"username": username, "month": month, "counterparty": counterparty},
+            {"$inc": dict(deltas)},
+            upsert=True
+        )
+        for (username, month, counterparty), deltas in merged.items()
+    ]
+
+async def record_debt_event(db, debt: dict, event: str):
+    """Apply one debt event to debt_rollups"""
+    await db.debt_rollups.bulk_write(rollup_updates(rollup_increments(debt, event)), ordered=False)
+
+def summarize_rollups(rows: List[dict]) -> dict:
+    """Sum rollup rows into per-month, per-counterparty and overall totals"""
+    by_month = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    by_counterparty = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+
+    for row in rows:
+        for field in ROLLUP_FIELDS:
+            value = row.get(field, 0)
+            by_month[row["month"]][field] += value
+            by_counterparty[row["counterparty"]][field] += value
+            totals[field] += value
+
+    def rounded(values: dict) -> dict:
+        return {field: round(value, 2) for field, value in values.items()}
+
+    counterparties = sorted(
+        by_counterparty.items(),
+        key=lambda item: item[1]["lent"] + item[1]["borrowed"],
+        reverse=True
+    )
+    return {
+        "months": [{"month": month, **rounded(values)} for month, values in sorted(by_month.items())],
+        "counterparties": [{"username": name, **rounded(values)} for name, values in counterparties],
+        "totals": {**rounded(totals), "net": round(totals["lent"] - totals["borrowed"], 2)},
+    }
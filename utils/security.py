@@ -2,11 +2,15 @@ from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status, Cookie
+from fastapi import Depends, HTTPException, status, Cookie, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
+from utils.revocation import denylist
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
@@ -24,6 +28,10 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def warm_password_hashing():
+    """Load the bcrypt backend so the first login doesn't pay for it"""
+    pwd_context.dummy_verify()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -32,10 +40,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # Sub-second iat so "log out everywhere" can tell apart tokens issued in the same second
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Key in scope["state"] where admission control leaves the (token, payload) it decoded
+DECODED_TOKEN_STATE = "decoded_token"
+
 def decode_token(token: str) -> dict:
     """Decode JWT token"""
     try:
@@ -44,18 +56,12 @@ def decode_token(token: str) -> dict:
     except JWTError:
         return None
 
-async def get_current_user(
+def get_token_payload(
+    request: Request,
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     token: Optional[str] = Cookie(None)
-):
-    """Get current authenticated user from token"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    # Try to get token from Authorization header or cookie
+) -> Optional[dict]:
+    """Decode the token from the Authorization header or cookie, if any"""
     token_str = None
     if credentials:
         token_str = credentials.credentials
@@ -63,9 +69,21 @@ async def get_current_user(
         token_str = token
     
     if not token_str:
-        raise credentials_exception
+        return None
+    # Reuse the admission middleware's decode instead of verifying the JWT twice
+    decoded = getattr(request.state, DECODED_TOKEN_STATE, None)
+    if decoded and decoded[0] == token_str:
+        return decoded[1]
+    return decode_token(token_str)
+
+async def get_current_user(payload: Optional[dict] = Depends(get_token_payload)):
+    """Get current authenticated user from token"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
     
-    payload = decode_token(token_str)
     if payload is None:
         raise credentials_exception
     
@@ -73,4 +91,8 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
+    # In-memory Bloom check; only a probable hit goes to MongoDB
+    if await denylist.is_revoked(payload):
+        raise credentials_exception
+    
     return {"username": username, "user_id": payload.get("user_id")}